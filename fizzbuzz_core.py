@@ -1,8 +1,12 @@
 # Core FizzBuzz generation engine with maths for divisors, primes, fibonacci, and ranges
 
 import math
-from typing import Set, List, Dict, Any, Tuple, Callable
-from dataclasses import dataclass
+import os
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Set, List, Dict, Any, Tuple, Callable, Optional, Sequence
+from dataclasses import dataclass, field
 from enum import Enum
 
 
@@ -13,6 +17,33 @@ class BlockType(Enum):
     RANGE = "range"
 
 
+# Integer codes for block types, used by the array based matching kernel
+KIND_NONE, KIND_DIVISOR, KIND_PRIME, KIND_FIBONACCI, KIND_RANGE = 0, 1, 2, 3, 4
+BLOCK_KINDS = {
+    BlockType.DIVISOR: KIND_DIVISOR,
+    BlockType.PRIME: KIND_PRIME,
+    BlockType.FIBONACCI: KIND_FIBONACCI,
+    BlockType.RANGE: KIND_RANGE,
+}
+
+
+# Gaps between numbers coprime to 30, starting from 7 (7, 11, 13, 17, 19, 23, 29, 31, ...)
+WHEEL_STEPS = (4, 2, 4, 2, 4, 6, 2, 6)
+
+# Largest prime sieve kept between calls (one byte per number), and the sieve built so far
+PRIME_SIEVE_CACHE_LIMIT = 10_000_000
+_prime_sieve = bytearray()
+
+# How many numbers a batch processes between progress reports
+PROGRESS_INTERVAL = 50
+
+# How many slices of the range each worker process gets in a parallel batch
+CHUNKS_PER_WORKER = 4
+
+# Most blocks for which match combinations are numbered through a lookup table with an entry per combination
+COMBO_TABLE_BITS = 16
+
+
 @dataclass
 class RuleBlock:
     id: str
@@ -20,6 +51,7 @@ class RuleBlock:
     name: str
     properties: Dict[str, Any]
     order: int = 0
+    color: Optional[str] = field(default=None, compare=False)  # Display colour, assigned by the GUI
 
 
 @dataclass
@@ -30,19 +62,78 @@ class FizzBuzzResult:
     matching_blocks: List[RuleBlock]
 
 
+class FizzBuzzResults(Sequence):
+    # Read-only sequence of FizzBuzzResult over the columns from generate_fizzbuzz_batch_soa,
+    # each result object is only created when it is accessed
+    
+    def __init__(self, columns: Dict[str, Any]):
+        self.columns = columns
+    
+    def __len__(self) -> int:
+        return len(self.columns['texts'])
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result index out of range")
+        
+        columns = self.columns
+        first, last = columns['match_rows'][index], columns['match_rows'][index + 1]
+        return FizzBuzzResult(
+            number=int(columns['numbers'][index]),
+            text=columns['texts'][index],
+            result_type=columns['result_types'][index],
+            matching_blocks=[columns['blocks'][j] for j in columns['match_cols'][first:last].tolist()]
+        )
+    
+    def __iter__(self):
+        # Walk the columns directly rather than indexing the arrays once per result
+        columns = self.columns
+        blocks = columns['blocks']
+        match_rows = columns['match_rows'].tolist()
+        match_cols = columns['match_cols'].tolist()
+        for i, (number, text, result_type) in enumerate(zip(columns['numbers'].tolist(), columns['texts'],
+                                                            columns['result_types'])):
+            yield FizzBuzzResult(
+                number=number,
+                text=text,
+                result_type=result_type,
+                matching_blocks=[blocks[j] for j in match_cols[match_rows[i]:match_rows[i + 1]]]
+            )
+
+
+# Blocks in rule order with their properties pulled out into parallel lists, indexed by block position
+BlockPlan = namedtuple('BlockPlan', 'kinds divisors range_lo range_hi words blocks')
+
+
+# A matched block as (word, block, result type), and a compiled test returning the hit for a number
+Hit = Tuple[str, RuleBlock, str]
+Matcher = Callable[[int], Optional[Hit]]
+
+
 def is_prime(n: int) -> bool:
     # Check if a number is prime
     if n < 2:
         return False
-    if n == 2:
+    if n < len(_prime_sieve):
+        return bool(_prime_sieve[n])
+    if n in (2, 3, 5):
         return True
-    if n % 2 == 0:
+    if n % 2 == 0 or n % 3 == 0 or n % 5 == 0:
         return False
     
-    # Check odd divisors up to sqrt(n)
-    for i in range(3, int(math.sqrt(n)) + 1, 2):
+    # Check divisors up to sqrt(n) using a 2-3-5 wheel, skipping multiples of 2, 3 and 5
+    limit = math.isqrt(n)
+    i = 7
+    k = 0
+    while i <= limit:
         if n % i == 0:
             return False
+        i += WHEEL_STEPS[k & 7]
+        k += 1
     return True
 
 
@@ -61,37 +152,183 @@ def generate_fibonacci_set(max_value: int) -> Set[int]:
     return fibonacci_set
 
 
-def process_number(number: int, blocks: List[RuleBlock], fibonacci_set: Set[int] = None) -> FizzBuzzResult:
-    # Process a single number againist all rule blocks and return the result
-    if fibonacci_set is None:
-        fibonacci_set = set()
+def generate_fibonacci_segment(start: int, end: int) -> bytearray:
+    # Generate a flag per number from start to end (fibonacci_flags[n - start] is 1 if n is a Fibonacci number)
+    fibonacci_flags = bytearray(max(end - start + 1, 0))
+    a, b = 1, 1
     
-    result_parts = []
-    matching_blocks = []
+    while b <= end:
+        if b >= start:
+            fibonacci_flags[b - start] = 1
+        a, b = b, a + b
+    
+    return fibonacci_flags
+
+
+def generate_prime_set(max_value: int) -> bytearray:
+    # Generate a Sieve of Eratosthenes up to a maximum value (prime_set[n] is 1 if n is prime)
+    # The sieve may be longer than asked for, as a cached larger sieve is reused and must not be modified
+    global _prime_sieve
+    if max_value < len(_prime_sieve):
+        return _prime_sieve
+    if max_value < 2:
+        return bytearray(max(max_value + 1, 0))
+    
+    sieve = bytearray(b'\x01') * (max_value + 1)
+    sieve[0] = sieve[1] = 0
+    
+    # Cross off multiples of each prime, slice assignment does the inner loop in C
+    limit = math.isqrt(max_value)
+    for i in range(2, limit + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, max_value + 1, i)))
+    
+    # Keep the sieve for later batches and is_prime, within a memory limit
+    if max_value <= PRIME_SIEVE_CACHE_LIMIT:
+        _prime_sieve = sieve
+    
+    return sieve
+
+
+def generate_prime_segment(start: int, end: int) -> bytearray:
+    # Generate prime flags for the numbers from start to end only (prime_flags[n - start] is 1 if n is prime),
+    # crossing off multiples of the primes up to sqrt(end). Memory and time follow the length of the range
+    # rather than end, so a short range of large numbers doesn't need a sieve of everything below it
+    if end < len(_prime_sieve):
+        return _prime_sieve[start:end + 1]
+    
+    segment = bytearray(b'\x01') * (end - start + 1)
+    segment[:max(2 - start, 0)] = bytes(max(2 - start, 0))  # 0 and 1 are not prime
     
-    for block in sorted(blocks, key=lambda b: b.order):
-        block_matches = False
+    limit = math.isqrt(end)
+    base_primes = generate_prime_set(limit)
+    for p in range(2, limit + 1):
+        if base_primes[p]:
+            first = max(p * p, -(-start // p) * p)
+            segment[first - start::p] = bytes(len(range(first, end + 1, p)))
+    
+    return segment
+
+
+def plan_blocks(blocks: List[RuleBlock]) -> BlockPlan:
+    # Sort blocks into rule order and pull their properties out into flat lists, once per batch
+    sorted_blocks = sorted(blocks, key=lambda b: b.order)
+    return BlockPlan(
+        kinds=[BLOCK_KINDS.get(b.block_type, KIND_NONE) for b in sorted_blocks],
+        divisors=[b.properties['divisor'] if b.block_type == BlockType.DIVISOR else 1 for b in sorted_blocks],
+        range_lo=[b.properties['start'] if b.block_type == BlockType.RANGE else 0 for b in sorted_blocks],
+        range_hi=[b.properties['end'] if b.block_type == BlockType.RANGE else -1 for b in sorted_blocks],
+        words=[b.properties['word'] for b in sorted_blocks],
+        blocks=sorted_blocks
+    )
+
+
+def compile_blocks(blocks: List[RuleBlock], fibonacci_flags: bytearray = None,
+                   prime_set: bytearray = None) -> List[Matcher]:
+    # Turn each block into a small matcher that returns (word, block, result type) on a match and None
+    # otherwise, so the per-number loop has no block type checks or property lookups left in it
+    matchers = []
+    for kind, divisor, range_start, range_end, word, block in zip(*plan_blocks(blocks)):
+        hit = (word, block, get_block_result_type(block))
         
-        if block.block_type == BlockType.DIVISOR and number % block.properties['divisor'] == 0:
-            block_matches = True
-        elif block.block_type == BlockType.PRIME and is_prime(number):
-            block_matches = True
-        elif block.block_type == BlockType.FIBONACCI and number in fibonacci_set:
-            block_matches = True
-        elif block.block_type == BlockType.RANGE:
-            props = block.properties
-            if props['start'] <= number <= props['end']:
-                block_matches = True
+        if kind == KIND_DIVISOR:
+            matchers.append(lambda n, d=divisor, hit=hit: hit if n % d == 0 else None)
+        elif kind == KIND_PRIME and prime_set is not None:
+            matchers.append(lambda n, check=prime_set.__getitem__, hit=hit: hit if check(n) else None)
+        elif kind == KIND_PRIME:
+            # No sieve, so rule out even numbers and multiples of 3 inline before calling is_prime
+            matchers.append(lambda n, hit=hit: hit if n in (2, 3) or (n > 3 and n & 1 and n % 3 and is_prime(n)) else None)
+        elif kind == KIND_FIBONACCI and fibonacci_flags is not None:
+            matchers.append(lambda n, check=fibonacci_flags.__getitem__, hit=hit: hit if check(n) else None)
+        elif kind == KIND_RANGE:
+            matchers.append(lambda n, lo=range_start, hi=range_end, hit=hit: hit if lo <= n <= hi else None)
+    
+    return matchers
+
+
+def compile_classifier(blocks: List[RuleBlock], fibonacci_flags: bytearray = None, prime_set: bytearray = None,
+                        flags_start: int = 0) -> Callable[[int, Optional[str]], FizzBuzzResult]:
+    # Generate the source of a function that tests a number against these exact blocks and exec it, giving
+    # straight-line code with the divisors, ranges, words and result types written in as constants.
+    # The result is the same as process_compiled_number with the matchers from compile_blocks.
+    # The flags hold number n at index n - flags_start
+    flag_index = f"n - {int(flags_start)}" if flags_start else "n"
+    namespace = {'FizzBuzzResult': FizzBuzzResult, 'is_prime': is_prime,
+                 'is_fibonacci': fibonacci_flags, 'is_prime_flag': prime_set}
+    lines = ["def classify(n, number_text=None):",
+             "    text = ''",
+             "    matching_blocks = []",
+             "    result_type = 'number'",
+             "    saw_fizz = saw_buzz = False"]
+    
+    for j, (kind, divisor, range_start, range_end, word, block) in enumerate(zip(*plan_blocks(blocks))):
+        if kind == KIND_DIVISOR:
+            test = f"n % {int(divisor)} == 0"
+        elif kind == KIND_PRIME and prime_set is not None:
+            test = f"is_prime_flag[{flag_index}]"
+        elif kind == KIND_PRIME:
+            test = "n in (2, 3) or (n > 3 and n & 1 and n % 3 and is_prime(n))"
+        elif kind == KIND_FIBONACCI and fibonacci_flags is not None:
+            test = f"is_fibonacci[{flag_index}]"
+        elif kind == KIND_RANGE:
+            test = f"{int(range_start)} <= n <= {int(range_end)}"
+        else:
+            continue
         
-        if block_matches:
-            result_parts.append(block.properties['word'])
+        namespace[f'block_{j}'] = block
+        block_result_type = get_block_result_type(block)
+        lines += [f"    if {test}:",
+                  f"        text += {word!r}",
+                  f"        matching_blocks.append(block_{j})",
+                  f"        result_type = {block_result_type!r}"]
+        if block_result_type in ('Fizz', 'Buzz'):
+            lines.append(f"        saw_{block_result_type.lower()} = True")
+    
+    lines += ["    if not matching_blocks:",
+              "        text = number_text if number_text is not None else str(n)",
+              "    elif len(matching_blocks) > 1:",
+              "        result_type = 'FizzBuzz' if saw_fizz and saw_buzz else 'combination'",
+              "    return FizzBuzzResult(number=n, text=text, result_type=result_type, matching_blocks=matching_blocks)"]
+    
+    exec('\n'.join(lines), namespace)
+    return namespace['classify']
+
+
+def process_number(number: int, blocks: List[RuleBlock], fibonacci_flags: bytearray = None,
+                   prime_set: bytearray = None) -> FizzBuzzResult:
+    # Process a single number againist all rule blocks and return the result
+    return process_compiled_number(number, compile_blocks(blocks, fibonacci_flags, prime_set))
+
+
+def process_compiled_number(number: int, matchers: List[Matcher], number_text: str = None) -> FizzBuzzResult:
+    # Process a single number against matchers built by compile_blocks
+    # number_text can be passed in when the caller has already converted the number to a string
+    final_text = ''
+    matching_blocks = []
+    
+    # Track what get_result_type needs while matching, rather than re-scanning the matches afterwards
+    result_type = 'number'
+    saw_fizz = saw_buzz = False
+    
+    for matcher in matchers:
+        match = matcher(number)
+        if match is not None:
+            # Words are appended straight onto the text, there are rarely more than a couple of matches
+            word, block, result_type = match
+            final_text += word
             matching_blocks.append(block)
+            if result_type == 'Fizz':
+                saw_fizz = True
+            elif result_type == 'Buzz':
+                saw_buzz = True
     
-    # Generate the final text result
-    final_text = ''.join(result_parts) if result_parts else str(number)
+    # Fall back to the number itself when nothing matched
+    if not matching_blocks:
+        final_text = number_text if number_text is not None else str(number)
     
-    # Determine result type
-    result_type = get_result_type(result_parts, matching_blocks)
+    # A single match keeps its block's result type, multiple matches are a combination
+    if len(matching_blocks) > 1:
+        result_type = 'FizzBuzz' if saw_fizz and saw_buzz else 'combination'
     
     return FizzBuzzResult(
         number=number,
@@ -101,28 +338,32 @@ def process_number(number: int, blocks: List[RuleBlock], fibonacci_set: Set[int]
     )
 
 
+def get_block_result_type(block: RuleBlock) -> str:
+    # Result type for a number matched by this block alone
+    if block.block_type == BlockType.DIVISOR:
+        word = block.properties.get('word', '')
+        if word == 'Fizz':
+            return 'Fizz'
+        elif word == 'Buzz':
+            return 'Buzz'
+        else:
+            return 'divisor_custom'
+    elif block.block_type == BlockType.PRIME:
+        return 'Prime'
+    elif block.block_type == BlockType.FIBONACCI:
+        return 'Fib'
+    elif block.block_type == BlockType.RANGE:
+        return 'range_custom'
+    else:
+        return 'combination'
+
+
 def get_result_type(result_parts: List[str], matching_blocks: List[RuleBlock]) -> str:
    # Determine the type of result for graphing
     if not result_parts:
         return 'number'
     elif len(matching_blocks) == 1:
-        block = matching_blocks[0]
-        if block.block_type == BlockType.DIVISOR:
-            word = block.properties.get('word', '')
-            if word == 'Fizz':
-                return 'Fizz'
-            elif word == 'Buzz':
-                return 'Buzz'
-            else:
-                return 'divisor_custom'
-        elif block.block_type == BlockType.PRIME:
-            return 'Prime'
-        elif block.block_type == BlockType.FIBONACCI:
-            return 'Fib'
-        elif block.block_type == BlockType.RANGE:
-            return 'range_custom'
-        else:
-            return 'combination'
+        return get_block_result_type(matching_blocks[0])
     else:
         # Multiple block matches - check for special combinations
         fizz_blocks = [b for b in matching_blocks if b.block_type == BlockType.DIVISOR and b.properties.get('word') == 'Fizz']
@@ -134,29 +375,368 @@ def get_result_type(result_parts: List[str], matching_blocks: List[RuleBlock]) -
             return 'combination'
 
 
-def generate_fizzbuzz_batch(start: int, end: int, blocks: List[RuleBlock], 
-                           progress_callback: Callable[[float], None] = None) -> List[FizzBuzzResult]:
-    # Generate FizzBuzz results for a range of numbers with optional progress reporting.
+def validate_batch(start: int, end: int, blocks: List[RuleBlock]):
+    # Check the range and blocks are usable before generating a batch
     if not blocks:
         raise ValueError("No blocks defined")
     if start >= end:
         raise ValueError("Start must be less than end")
     if start < 1:
         raise ValueError("Start must be at least 1")
+
+
+def generate_fizzbuzz_batch(start: int, end: int, blocks: List[RuleBlock], 
+                           progress_callback: Callable[[float], None] = None) -> List[FizzBuzzResult]:
+    # Generate FizzBuzz results for a range of numbers with optional progress reporting.
+    validate_batch(start, end, blocks)
+    
+    # Pre-generate flags for just this range, so membership is an index rather than a hash lookup or trial
+    # division, and costs the length of the range rather than its end. They are the segments batch_flags
+    # builds, kept as bytearrays as indexing one per number is quicker than indexing an array
+    fibonacci_flags = (generate_fibonacci_segment(start, end)
+                       if any(b.block_type == BlockType.FIBONACCI for b in blocks) else None)
+    prime_set = generate_prime_segment(start, end) if any(b.block_type == BlockType.PRIME for b in blocks) else None
     
-    # Pre-generate Fibonacci set 
-    fibonacci_set = generate_fibonacci_set(end) if any(b.block_type == BlockType.FIBONACCI for b in blocks) else set()
+    # Compile the blocks once into a function specialised for them, rather than checking each block per number.
+    # Both sets of flags hold number n at index n - start
+    classify = compile_classifier(blocks, fibonacci_flags, prime_set, start)
+    
+    # Most numbers match nothing, so find the ones that can match up front and skip the blocks for the rest
+    candidates = candidate_mask(start, end, blocks, fibonacci_flags, prime_set, start).tolist()
+    
+    def process_numbers(numbers: range) -> List[FizzBuzzResult]:
+        # Numbers are converted to text by map() as they are reached, which is cheaper than str() per call
+        numbers_candidates = candidates[numbers.start - start:numbers.stop - start]
+        return [classify(number, text) if candidate
+                else FizzBuzzResult(number=number, text=text, result_type='number', matching_blocks=[])
+                for number, text, candidate in zip(numbers, map(str, numbers), numbers_candidates)]
+    
+    if not progress_callback:
+        return process_numbers(range(start, end + 1))
     
     results = []
     total_numbers = end - start + 1
     
-    for i, number in enumerate(range(start, end + 1)):
-        result = process_number(number, blocks, fibonacci_set)
-        results.append(result)
+    # Report progress between slices of numbers, so the loop itself has no progress checks
+    for slice_start in range(start, end + 1, PROGRESS_INTERVAL):
+        slice_end = min(slice_start + PROGRESS_INTERVAL - 1, end)
+        results.extend(process_numbers(range(slice_start, slice_end + 1)))
         
-        # Report progress if callback provided
-        if progress_callback and ((i + 1) % 50 == 0 or i == total_numbers - 1):
-            progress = (i + 1) / total_numbers * 100
-            progress_callback(progress)
+        progress = (slice_end - start + 1) / total_numbers * 100
+        progress_callback(progress)
     
     return results
+
+
+def candidate_mask(start: int, end: int, blocks: List[RuleBlock], fibonacci_flags: bytearray = None,
+                   prime_set: bytearray = None, flags_start: int = 0) -> np.ndarray:
+    # Flag the numbers in [start, end] that match at least one block, any other number is just itself.
+    # The flags hold number n at index n - flags_start
+    flags = slice(start - flags_start, end - flags_start + 1)
+    plan = plan_blocks(blocks)
+    candidates = np.zeros(end - start + 1, dtype=np.bool_)
+    
+    for kind, divisor, range_start, range_end in zip(plan.kinds, plan.divisors, plan.range_lo, plan.range_hi):
+        if kind == KIND_DIVISOR:
+            # Step straight through the multiples of the divisor, no modulo per number needed
+            candidates[(-start) % divisor::divisor] = True
+        elif kind == KIND_PRIME:
+            if prime_set is None:
+                return np.ones(end - start + 1, dtype=np.bool_)
+            candidates |= np.frombuffer(prime_set, dtype=np.bool_)[flags]
+        elif kind == KIND_FIBONACCI and fibonacci_flags is not None:
+            candidates |= np.frombuffer(fibonacci_flags, dtype=np.bool_)[flags]
+        elif kind == KIND_RANGE:
+            candidates[max(range_start, start) - start:max(range_end - start + 1, 0)] = True
+    
+    return candidates
+
+
+def match_kernel(nums: np.ndarray, kinds: np.ndarray, divisors: np.ndarray, range_starts: np.ndarray,
+                 range_ends: np.ndarray, fibonacci_flags: Optional[np.ndarray], prime_flags: Optional[np.ndarray],
+                 out_match: np.ndarray, flags_start: int = 0):
+    # Fill out_match[i, j] with 1 where nums[i] matches block j, one vectorised pass per block.
+    # The prime and Fibonacci flags hold number n at index n - flags_start
+    for j, kind in enumerate(kinds.tolist()):
+        column = out_match[:, j]
+        if kind == KIND_DIVISOR:
+            np.equal(nums % divisors[j], 0, out=column, casting='unsafe')
+        elif kind == KIND_PRIME:
+            column[:] = prime_flags[nums - flags_start]
+        elif kind == KIND_FIBONACCI:
+            column[:] = fibonacci_flags[nums - flags_start]
+        elif kind == KIND_RANGE:
+            column[:] = (nums >= range_starts[j]) & (nums <= range_ends[j])
+        else:
+            column[:] = 0
+
+
+def match_codes_kernel(start: int, kinds: np.ndarray, divisors: np.ndarray, range_starts: np.ndarray,
+                       range_ends: np.ndarray, fibonacci_flags: Optional[np.ndarray],
+                       prime_flags: Optional[np.ndarray], out_codes: np.ndarray, flags_start: int = 0):
+    # Set bit j of out_codes[i] where start + i matches block j, for out_codes zeroed by the caller.
+    # The numbers are consecutive, so a divisor's matches are every d-th entry, flags are a slice and
+    # a range is one run of entries, and no block needs a pass over the numbers themselves.
+    # The prime and Fibonacci flags hold number n at index n - flags_start
+    end = start + out_codes.size - 1
+    for j, kind in enumerate(kinds.tolist()):
+        bit = 1 << j
+        if kind == KIND_DIVISOR:
+            out_codes[-start % int(divisors[j])::int(divisors[j])] |= bit
+        elif kind == KIND_PRIME or kind == KIND_FIBONACCI:
+            flags = prime_flags if kind == KIND_PRIME else fibonacci_flags
+            out_codes |= np.left_shift(flags[start - flags_start:end - flags_start + 1], j, dtype=out_codes.dtype)
+        elif kind == KIND_RANGE:
+            lo = max(int(range_starts[j]), start)
+            hi = min(int(range_ends[j]), end)
+            if lo <= hi:
+                out_codes[lo - start:hi - start + 1] |= bit
+
+
+def group_matches(match: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Number the distinct rows of a match table. Returns the combination index of each row and the
+    # combinations themselves as rows of the table, so match == combo_matches[inverse]
+    block_count = match.shape[1]
+    if block_count > COMBO_TABLE_BITS:
+        # Too many blocks for a table, so sort the rows as bytes instead
+        packed = np.packbits(match, axis=1, bitorder='little')
+        keys = np.ascontiguousarray(packed).view(np.dtype((np.void, packed.shape[1]))).ravel()
+        combos, inverse = np.unique(keys, return_inverse=True)
+        combo_matches = np.unpackbits(combos.view(np.uint8).reshape(len(combos), -1), axis=1,
+                                      count=block_count, bitorder='little')
+        return inverse.ravel(), combo_matches
+    
+    # Give each row an integer code with bit j set when it matched block j
+    codes = np.zeros(match.shape[0], dtype=np.int32)
+    for j in range(block_count):
+        codes |= match[:, j].astype(np.int32) << j
+    return group_codes(codes, block_count)
+
+
+def group_codes(codes: np.ndarray, block_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Number the distinct match codes (bit j set for a match with block j) through a table indexed by code,
+    # which takes linear time where sorting would not. Returns results in the same form as group_matches
+    present = np.zeros(1 << block_count, dtype=bool)
+    present[codes] = True
+    combo_codes = np.flatnonzero(present)
+    table = np.empty(1 << block_count, dtype=np.int32)
+    table[combo_codes] = np.arange(len(combo_codes), dtype=np.int32)
+    
+    combo_matches = ((combo_codes[:, None] >> np.arange(block_count)) & 1).astype(np.uint8)
+    return table[codes], combo_matches
+
+
+def divisor_period(plan: BlockPlan, limit: int) -> Optional[int]:
+    # Number of consecutive numbers after which the matches repeat when every block is a divisor block
+    # (the least common multiple of the divisors), or None for other blocks or a period longer than limit
+    if any(kind not in (KIND_DIVISOR, KIND_NONE) for kind in plan.kinds):
+        return None
+    
+    period = 1
+    for divisor in plan.divisors:
+        period = period * divisor // math.gcd(period, divisor)
+        if period > limit:
+            return None
+    return period
+
+
+def repeat_pattern(pattern: np.ndarray, count: int) -> np.ndarray:
+    # Repeat pattern end to end up to count entries, doubling the filled part with each copy so even a short
+    # pattern takes only a few large copies
+    out = np.empty(count, dtype=pattern.dtype)
+    filled = min(pattern.size, count)
+    out[:filled] = pattern[:filled]
+    while filled < count:
+        step = min(filled, count - filled)
+        out[filled:filled + step] = out[:step]
+        filled += step
+    return out
+
+
+def generate_fizzbuzz_batch_soa(start: int, end: int, blocks: List[RuleBlock]) -> Dict[str, Any]:
+    # Generate FizzBuzz results as columns rather than one object per number, using NumPy masks over
+    # the whole range. match_cols[match_rows[i]:match_rows[i + 1]] are the indices into 'blocks'
+    # (sorted into rule order) of the blocks that matched numbers[i]
+    validate_batch(start, end, blocks)
+    return batch_columns(start, end, blocks)
+
+
+def batch_columns(start: int, end: int, blocks: List[RuleBlock], prime_flags: np.ndarray = None,
+                  fibonacci_flags: np.ndarray = None, flags_start: int = 0) -> Dict[str, Any]:
+    # Build the result columns for generate_fizzbuzz_batch_soa without validating the range, so it can
+    # also run on one slice of a larger batch. Prime and Fibonacci flags are generated when not given.
+    # The columns also give each number's match combination as an index into the per-combination result
+    # types, for callers that only need a value per result type
+    combos = classify_range(start, end, blocks, prime_flags, fibonacci_flags, flags_start)
+    inverse = combos['combo_index']
+    combo_matches = combos['combo_matches']
+    match = combo_matches[inverse]
+    
+    # Compressed rows of matching block indices, nonzero walks rows in order so columns stay in block order
+    match_rows = np.zeros(inverse.size + 1, dtype=np.int64)
+    np.cumsum(combo_matches.sum(axis=1, dtype=np.int64)[inverse], out=match_rows[1:])
+    
+    return {
+        'numbers': np.arange(start, end + 1, dtype=np.int64),
+        'texts': expand_texts(start, inverse, combos['combo_texts']),
+        'result_types': np.array(combos['combo_types'], dtype=object)[inverse].tolist(),
+        'match_rows': match_rows,
+        'match_cols': np.nonzero(match)[1],
+        'blocks': combos['blocks'],
+        'combo_index': inverse,
+        'combo_types': combos['combo_types'],
+    }
+
+
+def classify_range(start: int, end: int, blocks: List[RuleBlock], prime_flags: np.ndarray = None,
+                   fibonacci_flags: np.ndarray = None, flags_start: int = 0) -> Dict[str, Any]:
+    # Match a range of numbers against the blocks and describe the result compactly: 'combo_index' gives
+    # each number's match combination, in the smallest integer type that holds it, and 'combo_matches',
+    # 'combo_texts' and 'combo_types' give each combination's row of matched blocks (in rule order, see
+    # 'blocks'), text (None for the number itself) and result type. Prime and Fibonacci flags, if given,
+    # hold number n at index n - flags_start and are built for just this range otherwise
+    plan = plan_blocks(blocks)
+    sorted_blocks = plan.blocks
+    count = end - start + 1
+    
+    # Per-block parameters as arrays for the kernel
+    kinds = np.array(plan.kinds, dtype=np.int8)
+    divisors = np.array(plan.divisors, dtype=np.int64)
+    range_starts = np.array(plan.range_lo, dtype=np.int64)
+    range_ends = np.array(plan.range_hi, dtype=np.int64)
+    
+    # Prime and Fibonacci flags are shared by every block of that type
+    if (KIND_PRIME in kinds and prime_flags is None) or (KIND_FIBONACCI in kinds and fibonacci_flags is None):
+        prime_flags, fibonacci_flags = batch_flags(start, end, sorted_blocks)
+        flags_start = start
+    
+    # Group numbers by which blocks they matched, there are only a handful of distinct combinations.
+    # With few enough blocks the matches go straight into one code per number, without a match table
+    period = divisor_period(plan, count // 2)
+    if period is not None and len(sorted_blocks) <= COMBO_TABLE_BITS:
+        # Divisor matches repeat every period numbers, so only the first period is matched and grouped,
+        # and its combination indices are repeated over the range
+        codes = np.zeros(period, dtype=np.int32)
+        match_codes_kernel(start, kinds, divisors, range_starts, range_ends, fibonacci_flags, prime_flags, codes,
+                           flags_start)
+        period_inverse, combo_matches = group_codes(codes, len(sorted_blocks))
+        inverse = repeat_pattern(period_inverse.astype(np.min_scalar_type(len(combo_matches) - 1)), count)
+    elif len(sorted_blocks) <= COMBO_TABLE_BITS:
+        codes = np.zeros(count, dtype=np.int32)
+        match_codes_kernel(start, kinds, divisors, range_starts, range_ends, fibonacci_flags, prime_flags, codes,
+                           flags_start)
+        inverse, combo_matches = group_codes(codes, len(sorted_blocks))
+    else:
+        nums = np.arange(start, end + 1, dtype=np.int64)
+        match = np.empty((count, len(sorted_blocks)), dtype=np.uint8)
+        match_kernel(nums, kinds, divisors, range_starts, range_ends, fibonacci_flags, prime_flags, match,
+                     flags_start)
+        inverse, combo_matches = group_matches(match)
+    
+    # Work out the text and result type once per combination
+    combo_texts = []
+    combo_types = []
+    for row in combo_matches:
+        matching_indices = np.flatnonzero(row).tolist()
+        matching_blocks = [sorted_blocks[j] for j in matching_indices]
+        result_parts = [plan.words[j] for j in matching_indices]
+        combo_texts.append(''.join(result_parts) if matching_blocks else None)
+        combo_types.append(get_result_type(result_parts, matching_blocks))
+    
+    return {
+        'combo_index': inverse.astype(np.min_scalar_type(len(combo_matches) - 1), copy=False),
+        'combo_matches': combo_matches,
+        'combo_texts': combo_texts,
+        'combo_types': combo_types,
+        'blocks': sorted_blocks,
+    }
+
+
+def expand_texts(start: int, combo_index: np.ndarray, combo_texts: List[Optional[str]]) -> List[str]:
+    # Spread the per-combination texts from classify_range over the numbers with object array indexing,
+    # then fill in the numbers that matched nothing with their own text
+    texts = np.array(combo_texts, dtype=object)[combo_index]
+    unmatched = np.flatnonzero(np.equal(texts, None))
+    texts[unmatched] = list(map(str, (unmatched + start).tolist()))
+    return texts.tolist()
+
+
+def generate_fizzbuzz_batch_vec(start: int, end: int, blocks: List[RuleBlock]) -> Sequence[FizzBuzzResult]:
+    # Generate FizzBuzz results using NumPy masks, as a sequence that only builds result objects when read
+    return FizzBuzzResults(generate_fizzbuzz_batch_soa(start, end, blocks))
+
+
+def concat_columns(chunks: List[Dict[str, Any]], blocks: List[RuleBlock]) -> Dict[str, Any]:
+    # Join the columns of consecutive slices back into one batch, shifting each slice's match offsets
+    match_rows = [np.zeros(1, dtype=np.int64)]
+    offset = 0
+    for chunk in chunks:
+        match_rows.append(chunk['match_rows'][1:] + offset)
+        offset += int(chunk['match_rows'][-1])
+    
+    texts = []
+    result_types = []
+    for chunk in chunks:
+        texts.extend(chunk['texts'])
+        result_types.extend(chunk['result_types'])
+    
+    return {
+        'numbers': np.concatenate([chunk['numbers'] for chunk in chunks]),
+        'texts': texts,
+        'result_types': result_types,
+        'match_rows': np.concatenate(match_rows),
+        'match_cols': np.concatenate([chunk['match_cols'] for chunk in chunks]),
+        'blocks': sorted(blocks, key=lambda b: b.order),
+    }
+
+
+def process_chunk(chunk_start: int, chunk_end: int, blocks: List[RuleBlock]) -> Dict[str, Any]:
+    # Worker process task: build the columns for one slice of the range, sieving just that slice
+    return batch_columns(chunk_start, chunk_end, blocks)
+
+
+def batch_flags(start: int, end: int, blocks: List[RuleBlock]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    # Build the prime and Fibonacci flags for the numbers from start to end, holding number n at index
+    # n - start (the flags_start of classify_range), or None where no block needs them
+    block_types = {b.block_type for b in blocks}
+    prime_flags = (np.frombuffer(generate_prime_segment(start, end), dtype=np.uint8)
+                   if BlockType.PRIME in block_types else None)
+    fibonacci_flags = (np.frombuffer(generate_fibonacci_segment(start, end), dtype=np.uint8)
+                       if BlockType.FIBONACCI in block_types else None)
+    return prime_flags, fibonacci_flags
+
+
+def process_range_chunk(chunk_start: int, chunk_end: int, blocks: List[RuleBlock]) -> Dict[str, Any]:
+    # Worker task for a long-lived pool: classify one slice of a range, sieving just that slice.
+    # The compact result is mostly one small integer per number, which is cheap to send back from a worker process.
+    # Nothing shared is modified (the cached prime sieve is only ever replaced), so worker threads can run it at once
+    return classify_range(chunk_start, chunk_end, blocks)
+
+
+def generate_fizzbuzz_batch_parallel(start: int, end: int, blocks: List[RuleBlock],
+                                     progress_callback: Callable[[float], None] = None,
+                                     max_workers: int = None) -> Sequence[FizzBuzzResult]:
+    # Generate FizzBuzz results across several processes, each working on a contiguous slice of the range.
+    # Each worker builds the prime and Fibonacci flags for its own slice, so the cost follows the length
+    # of the range rather than its end
+    validate_batch(start, end, blocks)
+    
+    workers = max_workers or os.cpu_count() or 1
+    
+    # Several slices per worker keeps them all busy and gives the progress callback something to report
+    total_numbers = end - start + 1
+    chunk_size = max(1, -(-total_numbers // (workers * CHUNKS_PER_WORKER)))
+    bounds = [(s, min(s + chunk_size - 1, end)) for s in range(start, end + 1, chunk_size)]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_chunk, s, e, blocks): e - s + 1 for s, e in bounds}
+        
+        done_numbers = 0
+        for future in as_completed(futures):
+            done_numbers += futures[future]
+            if progress_callback:
+                progress_callback(done_numbers / total_numbers * 100)
+        
+        chunks = [future.result() for future in futures]
+    
+    return FizzBuzzResults(concat_columns(chunks, blocks))
@@ -3,23 +3,93 @@
 
 import tkinter as tk
 from tkinter import messagebox, ttk
-from typing import List, Dict, Any, Tuple, Optional
-import threading
+import tkinter.font as tkfont
+from typing import List, Dict, Any, Tuple, Optional, Set
+import asyncio
+import os
+import sys
+from collections import deque
+from itertools import repeat
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.colors import ListedColormap
-import matplotlib.patches as patches
 import random
 
 from fizzbuzz_core import (
     is_prime, generate_fibonacci_set, BlockType, RuleBlock, 
-    FizzBuzzResult, generate_fizzbuzz_batch, process_number
+    FizzBuzzResult, process_number, classify_range,
+    expand_texts, batch_flags, process_range_chunk
 )
 
 
+# Gap in pixels around block widgets in the workspace
+BLOCK_PADDING = 4
+
+# Palette for blocks without a fixed colour, and the fixed colours for Fizz and Buzz divisor blocks
+BLOCK_PALETTE = ("#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7",
+                 "#DDA0DD", "#98D8C8", "#F7DC6F", "#BB8FCE", "#85C1E9",
+                 "#F8C471", "#82E0AA", "#F1948A", "#85CEBC", "#D7BDE2")
+PALETTE_COLORS = frozenset(BLOCK_PALETTE)
+WORD_COLORS = {'Fizz': "#3B82F6", 'Buzz': "#EF4444"}  # Blue for Fizz, red for Buzz
+
+# Heatmap colours for plain numbers, FizzBuzz and other combinations
+NUMBER_COLOR = "#E5E7EB"
+FIZZBUZZ_COLOR = "#8B5CF6"  # Purple
+COMBINATION_COLOR = "#FF2ED9"  # Pink
+
+# Block descriptions keyed by block type and properties, so unchanged blocks are not formatted again
+_description_cache: Dict[Tuple[BlockType, Tuple], str] = {}
+
+# Numbers generated per step of the generation task, and milliseconds between steps
+GENERATION_CHUNK = 4096
+GENERATION_POLL_MS = 5
+
+# Milliseconds between progress bar updates while generating, about 60 per second
+PROGRESS_TICK_MS = 16
+
+# Milliseconds between appending the results generated since the last time to the results view
+RESULTS_FLUSH_MS = 50
+
+# Ranges larger than this are shown in a virtual view that only inserts the rows around the visible ones,
+# RESULTS_VIEW_ROWS at a time (more than fit in the text), scrolled RESULTS_WHEEL_ROWS per mouse wheel step
+VIRTUAL_RESULTS_THRESHOLD = 10_000
+RESULTS_VIEW_ROWS = 200
+RESULTS_WHEEL_ROWS = 3
+
+# Ranges larger than this are split into slices of PARALLEL_CHUNK numbers and generated by a pool of workers
+PARALLEL_THRESHOLD = 200_000
+PARALLEL_CHUNK = 65_536
+
+# Slices submitted to each worker ahead of the one being shown, so finished slices don't pile up
+PARALLEL_IN_FLIGHT = 2
+
+# Most heatmap cells drawn along each side, larger grids are sampled down as the figure has fewer pixels than that
+HEATMAP_MAX_CELLS = 500
+
+# Heatmap cells narrower than this many pixels are drawn without grid lines, which would cover them
+HEATMAP_MIN_GRID_PIXELS = 2
+
+# Largest side of the plain heatmap image in pixels, cells are scaled up by a whole number of pixels to fill it
+HEATMAP_IMAGE_PIXELS = 500
+
+# Heatmap legend entries per row
+HEATMAP_LEGEND_COLUMNS = 3
+
+# Detailed heatmap margins in pixels: at the sides, above the axes for the title, and below them for the legend,
+# which takes another HEATMAP_LEGEND_ROW_PIXELS per row of entries
+HEATMAP_SIDE_MARGIN = 15
+HEATMAP_TOP_MARGIN = 56
+HEATMAP_BOTTOM_MARGIN = 49
+HEATMAP_LEGEND_ROW_PIXELS = 20
+
+
+def format_results_text(numbers: range, texts: List[str]) -> str:
+    # Format a chunk of results as the lines of the results text ("  15: FizzBuzz"), ready to append in one insert.
+    # Each step is a builtin mapped over the chunk, so no Python code runs per line
+    padded_numbers = map(str.rjust, map(str, numbers), repeat(4))
+    return '\n'.join(map(': '.join, zip(padded_numbers, texts))) + '\n'
+
 
 class BlockWidget(tk.Frame):
     # On-screen representation of a rule block
@@ -32,6 +102,8 @@ class BlockWidget(tk.Frame):
         self.on_delete = on_delete
         self.on_move = on_move
         self.block_color = block_color
+        self.title_text = self.get_title()
+        self.desc_text = self.get_description()
         
         self.setup_widget()
     
@@ -45,12 +117,11 @@ class BlockWidget(tk.Frame):
         type_indicator.grid(row=0, column=0, rowspan=3, sticky="ns", padx=(5, 10), pady=5)
         
         # Block title and description
-        title_text = f"{self.block.block_type.value.title()}: {self.block.name}"
-        self.title_label = tk.Label(self, text=title_text, font=('Arial', 10, 'bold'), 
+        self.title_label = tk.Label(self, text=self.title_text, font=('Arial', 10, 'bold'), 
                                    anchor="w", bg='#f0f0f0')
         self.title_label.grid(row=0, column=1, sticky="ew", padx=(0, 10), pady=(5, 0))
         
-        self.desc_label = tk.Label(self, text=self.get_description(), font=('Arial', 9), 
+        self.desc_label = tk.Label(self, text=self.desc_text, font=('Arial', 9), 
                                   anchor="w", fg="gray", bg='#f0f0f0')
         self.desc_label.grid(row=1, column=1, sticky="ew", padx=(0, 10), pady=(0, 5))
         
@@ -58,8 +129,33 @@ class BlockWidget(tk.Frame):
         self.create_buttons()
         self.create_arrows()
     
+    def update_block(self, block: RuleBlock):
+        # Point the widget at an edited block and refresh its labels, keeping the widget itself.
+        # Labels whose text has not changed are left alone rather than configured with the same text
+        self.block = block
+        title_text = self.get_title()
+        if title_text != self.title_text:
+            self.title_text = title_text
+            self.title_label.configure(text=title_text)
+        desc_text = self.get_description()
+        if desc_text != self.desc_text:
+            self.desc_text = desc_text
+            self.desc_label.configure(text=desc_text)
+    
+    def get_title(self) -> str:
+        # Get title of the block (Type and name)
+        return f"{self.block.block_type.value.title()}: {self.block.name}"
+    
     def get_description(self) -> str:
-        # Get description of the block (For displaying on the block)
+        # Get description of the block (For displaying on the block), formatted once per distinct block
+        key = (self.block.block_type, tuple(sorted(self.block.properties.items())))
+        description = _description_cache.get(key)
+        if description is None:
+            description = _description_cache[key] = self.format_description()
+        return description
+    
+    def format_description(self) -> str:
+        # Format the description of the block from its properties
         props = self.block.properties
         try:
             if self.block.block_type == BlockType.DIVISOR:
@@ -284,7 +380,8 @@ class BlockEditorDialog(tk.Toplevel):
                 block_type=self.block_type,
                 name=name,
                 properties=properties,
-                order=self.block.order if self.block else 0
+                order=self.block.order if self.block else 0,
+                color=self.block.color if self.block else None
             )
             
             self.destroy()
@@ -331,13 +428,81 @@ class GUI:
         # Data
         self.blocks: List[RuleBlock] = []
         self.block_widgets: Dict[str, BlockWidget] = {}
-        self.block_colors: Dict[str, str] = {}  # Map block IDs to colors
-        self.is_generating = False
+        self.block_index: Dict[str, int] = {}  # Map block IDs to their position in self.blocks
+        self.canvas_items: Dict[str, int] = {}  # Map block IDs to their workspace canvas window items
+        self.canvas_item_rows: Dict[str, int] = {}  # Map block IDs to the row their item is placed at
+        self.block_row_height = 0
+        self.color_pool: List[str] = random.sample(BLOCK_PALETTE, len(BLOCK_PALETTE))  # Palette colours not in use
+        self.used_colors: Set[str] = set()  # Colours given to blocks that don't have a fixed colour
+        
+        # Heatmap colour index of each result type, heatmap colours and labels, and whether there are both Fizz
+        # and Buzz blocks, worked out from the blocks when the workspace is refreshed rather than per lookup
+        self.type_values: Dict[str, int] = {}
+        self.heatmap_colors: List[str] = []
+        self.heatmap_labels: List[str] = []
+        self.fizz_and_buzz = False
+        
+        # Generation state, the generate button and progress bar follow it through a trace
+        self.generating_var = tk.BooleanVar(value=False)
+        
+        # Latest progress from the generation task, copied to the progress bar by a timer
+        self.pending_progress = 0.0
+        self.progress_tick_id = None
+        
+        # Results of the last generation, as an index into result_texts per number (None in result_texts
+        # stands for the number itself). Rows are formatted as text only when they are shown
+        self.results_start = 0
+        self.result_codes = np.zeros(0, dtype=np.int32)
+        self.result_texts: List[Optional[str]] = []
+        self.result_text_codes: Dict[Optional[str], int] = {}
+        self.results_count = 0  # Results generated so far
+        self.results_shown = 0  # Results generated when the results view was last updated, by a timer
+        self.results_flush_id = None
+        
+        # Virtual results view state: the first row shown, and whether to keep showing the last rows as they arrive
+        self.results_virtual = False
+        self.results_top = 0
+        self.results_follow = True
+        
+        # Generation runs as a task on an asyncio loop that is stepped from the Tk event loop
+        self.loop = asyncio.new_event_loop()
+        self.generation_task: Optional[asyncio.Task] = None
+        
+        # Workers for large ranges, started on first use and kept for later generations
+        self.worker_pool: Optional[Executor] = None
+        
+        # Heatmap mode: a plain image of the cells, or a matplotlib figure when detailed, and the colour
+        # indices it was last drawn from so it can be drawn again in the other mode
+        self.heatmap_detailed_var = tk.BooleanVar(value=False)
+        self.heatmap_results: Optional[np.ndarray] = None
+        
+        # Plain heatmap image, kept referenced while shown, and the colours and labels its legend was built for
+        self.heatmap_photo: Optional[tk.PhotoImage] = None
+        self.heatmap_simple_legend_key = None
+        
+        # Heatmap figure, created on first use so matplotlib isn't loaded until there is something to show
+        self.heatmap_fig = None
+        self.heatmap_ax = None
+        self.heatmap_canvas = None
+        
+        # Heatmap artists redrawn over the saved background when only the cell values change
+        self.heatmap_image = None
+        self.heatmap_grid = None  # All the grid lines, as one LineCollection
+        self.heatmap_legend_key = None
+        self.heatmap_background = None
+        self.heatmap_blit_box = None  # Part of the figure those artists are in, copied to the screen after a blit
+        
+        # Colormap and legend patches for the heatmap colours and labels in heatmap_style_key, kept for later
+        # heatmaps until the blocks change
+        self.heatmap_style_key = None
+        self.heatmap_cmap = None
+        self.heatmap_legend_handles = []
         
         # Cleanup
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         self.setup_ui()
+        self.generating_var.trace_add("write", self.on_generating_change)
         self.create_default_blocks()
     
     def setup_ui(self):
@@ -380,17 +545,12 @@ class GUI:
                                   font=('Arial', 9), fg='gray', bg='#f8f9fa')
         workspace_label.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 2))
         
-        # Create canvas and scrolling
+        # Create canvas and scrolling, each block widget is placed straight onto the canvas as its own window
         canvas = tk.Canvas(parent, bg='white')
         scrollbar = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
-        self.workspace_frame = tk.Frame(canvas, bg='white')
-        
-        self.workspace_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        self.workspace_canvas = canvas
         
-        canvas.create_window((0, 0), window=self.workspace_frame, anchor="nw")
+        canvas.bind("<Configure>", lambda e: self.resize_workspace_items(e.width))
         canvas.configure(yscrollcommand=scrollbar.set)
         
         canvas.grid(row=2, column=0, sticky="nsew", padx=10, pady=(0, 10))
@@ -399,6 +559,12 @@ class GUI:
         parent.grid_rowconfigure(2, weight=1)
         parent.grid_columnconfigure(0, weight=1)
     
+    def resize_workspace_items(self, width: int):
+        # Stretch the block widgets to the canvas width (Only happens when the window is resized)
+        for item in self.canvas_items.values():
+            self.workspace_canvas.itemconfigure(item, width=width - 2 * BLOCK_PADDING)
+        self.workspace_canvas.configure(scrollregion=(0, 0, width, len(self.canvas_items) * self.block_row_height))
+    
     def create_action_buttons(self, parent):
         # Create clear button
         action_frame = tk.Frame(parent, bg='#f8f9fa')
@@ -476,12 +642,17 @@ class GUI:
         text_frame.grid_rowconfigure(0, weight=1)
         text_frame.grid_columnconfigure(0, weight=1)
         
-        self.results_text = tk.Text(text_frame, font=('Consolas', 10))
-        text_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.results_text.yview)
-        self.results_text.configure(yscrollcommand=text_scrollbar.set)
+        self.results_font = tkfont.Font(family='Consolas', size=10)
+        self.results_text = tk.Text(text_frame, font=self.results_font)
+        self.results_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.results_text.yview)
+        self.results_text.configure(yscrollcommand=self.results_scrollbar.set)
         
         self.results_text.grid(row=0, column=0, sticky="nsew")
-        text_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.results_scrollbar.grid(row=0, column=1, sticky="ns")
+        
+        # The mouse wheel scrolls the virtual view of large ranges rather than the rows inserted in the text
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.results_text.bind(sequence, self.on_results_wheel)
         
         # Heatmap section (Visual representation of results)
         self.create_heatmap_section(results_frame)
@@ -497,38 +668,64 @@ class GUI:
                                 bg='white')
         heatmap_title.grid(row=0, column=0, pady=(10, 5))
         
-        # Create canvas for scrollable heatmap
-        canvas = tk.Canvas(heatmap_frame, bg='white')
-        h_scrollbar = ttk.Scrollbar(heatmap_frame, orient="horizontal", command=canvas.xview)
-        v_scrollbar = ttk.Scrollbar(heatmap_frame, orient="vertical", command=canvas.yview)
-        
-        self.heatmap_scroll_frame = tk.Frame(canvas, bg='white')
-        
-        self.heatmap_scroll_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.heatmap_scroll_frame, anchor="nw")
-        canvas.configure(xscrollcommand=h_scrollbar.set, yscrollcommand=v_scrollbar.set)
+        # Placeholder until the first heatmap, when the plain image or the matplotlib figure takes its place
+        self.heatmap_frame = heatmap_frame
+        self.heatmap_placeholder = tk.Label(heatmap_frame, text="Generate results to see heatmap",
+                                            font=('Arial', 10), fg='gray', bg='white')
+        self.heatmap_placeholder.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+        
+        # Plain heatmap: title, image of the cells and legend, drawn with Tk alone
+        self.heatmap_simple_frame = tk.Frame(heatmap_frame, bg='white')
+        self.heatmap_simple_frame.grid_columnconfigure(0, weight=1)
+        self.heatmap_caption = tk.Label(self.heatmap_simple_frame, text="FizzBuzz Heatmap",
+                                        font=('Arial', 12, 'bold'), bg='white')
+        self.heatmap_caption.grid(row=0, column=0, pady=(5, 10))
+        self.heatmap_image_label = tk.Label(self.heatmap_simple_frame, bg='white')
+        self.heatmap_image_label.grid(row=1, column=0)
+        self.heatmap_legend_frame = tk.Frame(self.heatmap_simple_frame, bg='white')
+        self.heatmap_legend_frame.grid(row=2, column=0, pady=(10, 0))
+        
+        # Switch between the plain image and the matplotlib figure
+        detailed_check = tk.Checkbutton(heatmap_frame, text="Detailed heatmap (matplotlib)",
+                                        variable=self.heatmap_detailed_var, command=self.on_heatmap_mode_change,
+                                        bg='white')
+        detailed_check.grid(row=2, column=0, pady=(0, 5))
+    
+    def create_heatmap_figure(self):
+        # Create the matplotlib figure and canvas, to be placed straight into the frame by show_heatmap_view
+        if self.heatmap_fig is not None:
+            return
         
-        canvas.grid(row=1, column=0, sticky="nsew")
-        h_scrollbar.grid(row=2, column=0, sticky="ew")
-        v_scrollbar.grid(row=1, column=1, sticky="ns")
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         
-        # Create matplotlib figure and canvas
         self.heatmap_fig, self.heatmap_ax = plt.subplots(figsize=(6, 6), facecolor='white')
-        self.heatmap_canvas = FigureCanvasTkAgg(self.heatmap_fig, self.heatmap_scroll_frame)
-        self.heatmap_canvas.get_tk_widget().pack(padx=5, pady=5)
-        
-        # Initialize empty heatmap
-        self.heatmap_ax.set_title("FizzBuzz Heatmap", fontsize=12, fontweight='bold', pad=20)
-        self.heatmap_ax.text(0.5, 0.5, "Generate results to see heatmap", 
-                            ha='center', va='center', transform=self.heatmap_ax.transAxes,
-                            fontsize=10, color='gray')
-        self.heatmap_ax.set_xticks([])
-        self.heatmap_ax.set_yticks([])
-        self.heatmap_canvas.draw()
+        self.heatmap_canvas = FigureCanvasTkAgg(self.heatmap_fig, self.heatmap_frame)
+        self.heatmap_canvas.mpl_connect('draw_event', self.on_heatmap_draw)
+        self.heatmap_canvas.mpl_connect('resize_event', self.on_heatmap_resize)
+    
+    def show_heatmap_view(self, detailed: bool):
+        # Show the matplotlib figure or the plain heatmap in the heatmap area, in place of the placeholder
+        # or the other view. The matplotlib figure is only created the first time it is shown
+        if self.heatmap_placeholder is not None:
+            self.heatmap_placeholder.destroy()
+            self.heatmap_placeholder = None
+        
+        if detailed:
+            self.create_heatmap_figure()
+            shown, hidden = self.heatmap_canvas.get_tk_widget(), self.heatmap_simple_frame
+        else:
+            shown = self.heatmap_simple_frame
+            hidden = self.heatmap_canvas.get_tk_widget() if self.heatmap_canvas is not None else None
+        
+        if hidden is not None:
+            hidden.grid_remove()
+        shown.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+    
+    def on_heatmap_mode_change(self):
+        # Draw the last heatmap again in the mode just chosen
+        if self.heatmap_results is not None and len(self.heatmap_results):
+            self.create_heatmap(self.heatmap_results)
     
     def create_status_bar(self, parent):
         # Create status bar
@@ -544,58 +741,92 @@ class GUI:
         buzz_id = str(uuid.uuid4())
         
         self.blocks = [
-            RuleBlock(fizz_id, BlockType.DIVISOR, "Fizz", {'divisor': 3, 'word': 'Fizz'}, 0),
-            RuleBlock(buzz_id, BlockType.DIVISOR, "Buzz", {'divisor': 5, 'word': 'Buzz'}, 1)
+            RuleBlock(fizz_id, BlockType.DIVISOR, "Fizz", {'divisor': 3, 'word': 'Fizz'}, 0, WORD_COLORS['Fizz']),
+            RuleBlock(buzz_id, BlockType.DIVISOR, "Buzz", {'divisor': 5, 'word': 'Buzz'}, 1, WORD_COLORS['Buzz'])
         ]
         
-        # Assign default colors
-        self.block_colors[fizz_id] = "#3B82F6"  # Blue for Fizz
-        self.block_colors[buzz_id] = "#EF4444"  # Red for Buzz
-        
+        self.reorder_blocks()
         self.refresh_workspace()
     
     def generate_random_color(self) -> str:
-        colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7", 
-                  "#DDA0DD", "#98D8C8", "#F7DC6F", "#BB8FCE", "#85C1E9",
-                  "#F8C471", "#82E0AA", "#F1948A", "#85CEBC", "#D7BDE2"]
-        return random.choice(colors)
+        return "#%06X" % random.randint(0x202020, 0xFFFFFF)
     
     def assign_block_color(self, block: RuleBlock) -> str:
         # Assign color to block, keeping Fizz blue and Buzz red
         if block.block_type == BlockType.DIVISOR:
             word = block.properties.get('word', '')
-            if word == 'Fizz':
-                return "#3B82F6"  # Blue
-            elif word == 'Buzz':
-                return "#EF4444"  # Red
-        
-        # Generate random color for other blocks
-        color = self.generate_random_color()
-        if len(self.block_colors) < 15: # If we havent reached limit of 15 colours 
-            while color in self.block_colors.values():  # Avoid duplicates
+            if word in WORD_COLORS:
+                return WORD_COLORS[word]
+        
+        # Take an unused palette colour for other blocks, then random colours once the palette runs out
+        if self.color_pool:
+            color = self.color_pool.pop()
+        else:
+            color = self.generate_random_color()
+            while color in self.used_colors:  # Avoid duplicates
                 color = self.generate_random_color()
+        self.used_colors.add(color)
         return color
     
+    def release_block_color(self, block: RuleBlock):
+        # Drop a block's colour, returning a palette colour to the pool for the next block
+        color = block.color
+        block.color = None
+        if color in self.used_colors:
+            self.used_colors.remove(color)
+            if color in PALETTE_COLORS:
+                self.color_pool.append(color)
+    
     def refresh_workspace(self):
         # Refresh the workspace (Done after adding/deleting/editing or moving blocks)
-        for widget in self.block_widgets.values():
-            widget.destroy()
-        self.block_widgets.clear()
-        
+        # Existing widgets are reused, only widgets for new or deleted blocks are created or destroyed
         sorted_blocks = sorted(self.blocks, key=lambda b: b.order)
+        current_ids = {b.id for b in sorted_blocks}
         
-        for i, block in enumerate(sorted_blocks):
+        for block_id in set(self.block_widgets) - current_ids:
+            self.workspace_canvas.delete(self.canvas_items.pop(block_id))
+            self.canvas_item_rows.pop(block_id, None)
+            self.block_widgets.pop(block_id).destroy()
+        
+        for block in sorted_blocks:
             # Assign color if not already assigned
-            if block.id not in self.block_colors:
-                self.block_colors[block.id] = self.assign_block_color(block)
-            
-            widget = BlockWidget(self.workspace_frame, block, self.edit_block, 
-                               self.delete_block, self.move_block, self.block_colors[block.id])
-            widget.pack(fill="x", padx=5, pady=2)
-            self.block_widgets[block.id] = widget
+            if block.color is None:
+                block.color = self.assign_block_color(block)
             
-            # Update arrow button states
-            widget.update_arrow_states(i == 0, i == len(sorted_blocks) - 1)
+            widget = self.block_widgets.get(block.id)
+            if widget is None:
+                self.block_widgets[block.id] = BlockWidget(self.workspace_canvas, block, self.edit_block,
+                                                           self.delete_block, self.move_block, block.color)
+            elif widget.block is not block:
+                widget.update_block(block)
+        
+        self.update_block_caches(sorted_blocks)
+        
+        # Blocks all have the same layout, so the first widget decides the row height
+        sorted_ids = [b.id for b in sorted_blocks]
+        if sorted_ids and not self.block_row_height:
+            first_widget = self.block_widgets[sorted_ids[0]]
+            first_widget.update_idletasks()
+            self.block_row_height = first_widget.winfo_reqheight() + BLOCK_PADDING
+        
+        # Place new widgets and move only the ones whose row has changed
+        width = self.workspace_canvas.winfo_width() - 2 * BLOCK_PADDING
+        for i, block_id in enumerate(sorted_ids):
+            y = i * self.block_row_height + BLOCK_PADDING
+            item = self.canvas_items.get(block_id)
+            if item is None:
+                self.canvas_items[block_id] = self.workspace_canvas.create_window(
+                    BLOCK_PADDING, y, window=self.block_widgets[block_id], anchor="nw", width=max(width, 1))
+            elif self.canvas_item_rows.get(block_id) != i:
+                self.workspace_canvas.coords(item, BLOCK_PADDING, y)
+            self.canvas_item_rows[block_id] = i
+        
+        self.workspace_canvas.configure(scrollregion=(0, 0, width + 2 * BLOCK_PADDING,
+                                                      len(sorted_ids) * self.block_row_height))
+        
+        # Update arrow button states
+        for i, block_id in enumerate(sorted_ids):
+            self.block_widgets[block_id].update_arrow_states(i == 0, i == len(sorted_ids) - 1)
         
         # Update status display
         block_count = len(self.blocks)
@@ -608,6 +839,7 @@ class GUI:
         
         if dialog.result:
             dialog.result.order = len(self.blocks)
+            self.block_index[dialog.result.id] = len(self.blocks)
             self.blocks.append(dialog.result)
             self.refresh_workspace()
     
@@ -617,48 +849,53 @@ class GUI:
         self.root.wait_window(dialog)
         
         if dialog.result:
-            for i, b in enumerate(self.blocks):
-                if b.id == block.id:
-                    self.blocks[i] = dialog.result
-                    break
+            index = self.block_index.get(block.id)
+            if index is not None:
+                self.blocks[index] = dialog.result
             self.refresh_workspace()
     
     def delete_block(self, block_id: str):
         # Delete a block
-        self.blocks = [b for b in self.blocks if b.id != block_id]
-        # Remove color mapping
-        if block_id in self.block_colors:
-            del self.block_colors[block_id]
+        index = self.block_index.get(block_id)
+        if index is None:
+            return
+        block = self.blocks.pop(index)
+        # Return its colour to the pool
+        self.release_block_color(block)
         self.reorder_blocks()
         self.refresh_workspace()
     
     def move_block(self, block_id: str, direction: int):
-        # Move a block up or down
-        block_index = next(i for i, b in enumerate(self.blocks) if b.id == block_id)
+        # Move a block up or down by swapping it with its neighbour, only the two swapped blocks change order
+        i = self.block_index[block_id]
+        j = i + (1 if direction > 0 else -1)
+        if direction == 0 or not 0 <= j < len(self.blocks):
+            return
         
-        if direction < 0 and block_index > 0:  # Move up
-            self.blocks[block_index], self.blocks[block_index - 1] = self.blocks[block_index - 1], self.blocks[block_index]
-            self.reorder_blocks()
-            self.refresh_workspace()
-        elif direction > 0 and block_index < len(self.blocks) - 1:  # Move down
-            self.blocks[block_index], self.blocks[block_index + 1] = self.blocks[block_index + 1], self.blocks[block_index]
-            self.reorder_blocks()
-            self.refresh_workspace()
+        self.blocks[i], self.blocks[j] = self.blocks[j], self.blocks[i]
+        for index in (i, j):
+            self.blocks[index].order = index
+            self.block_index[self.blocks[index].id] = index
+        self.refresh_workspace()
     
     def reorder_blocks(self):
-        # Update order values for all blocks
+        # Update order values and the ID index for all blocks
+        self.block_index.clear()
         for i, block in enumerate(self.blocks):
             block.order = i
+            self.block_index[block.id] = i
     
     def clear_all_blocks(self):
         # Clear all blocks
         self.blocks.clear()
-        self.block_colors.clear()  # Clear color mappings
+        self.block_index.clear()
+        self.color_pool = random.sample(BLOCK_PALETTE, len(BLOCK_PALETTE))
+        self.used_colors.clear()
         self.refresh_workspace()
     
     def generate_fizzbuzz(self):
         # Generate FizzBuzz results based on current blocks
-        if self.is_generating:
+        if self.generating_var.get():
             return
         
         try:
@@ -672,121 +909,367 @@ class GUI:
             if not self.blocks:
                 raise ValueError("No blocks defined")
             
-            self.is_generating = True
-            self.generate_btn.configure(text="Generating...", state=tk.DISABLED)
-            self.progress_var.set(0)
+            self.generating_var.set(True)
             
-            # Run generation in separate thread
-            thread = threading.Thread(target=self.generate_worker, args=(start, end))
-            thread.daemon = True
-            thread.start()
+            # Run generation as a task stepped between Tk events, so all widget updates stay on the main thread
+            self.generation_task = self.loop.create_task(self.generate_task(start, end, list(self.blocks)))
+            self.root.after(GENERATION_POLL_MS, self.pump_event_loop)
             
         except ValueError as e:
             messagebox.showerror("Invalid Input", str(e))
     
-    def generate_worker(self, start: int, end: int):
-        # Worker thread for FizzBuzz generation using core functions
+    def pump_event_loop(self):
+        # Run the asyncio loop until it has no ready callbacks, then come back while the task is running
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        if self.generation_task and not self.generation_task.done():
+            self.root.after(GENERATION_POLL_MS, self.pump_event_loop)
+    
+    async def generate_task(self, start: int, end: int, blocks: List[RuleBlock]):
+        # Generate FizzBuzz results chunk by chunk, yielding to Tk between chunks
         try:
-            # Clear results and heatmap
-            self.root.after(0, self.clear_display)
-            
-            # Use core generation function with progress callback
-            def progress_callback(progress):
-                self.root.after(0, lambda p=progress: self.progress_var.set(p))
-            
-            # Generate all results using the core function
-            fizzbuzz_results = generate_fizzbuzz_batch(start, end, self.blocks, progress_callback)
+            total_numbers = end - start + 1
+            self.reset_results(start, total_numbers)
             
-            # Convert results for display
-            text_results = []
-            heatmap_data = []
+            # Heatmap colour index of every number, allocated once and filled in chunk by chunk
+            heatmap_dtype = self.heatmap_dtype()
+            heatmap_values = np.empty(total_numbers, dtype=heatmap_dtype)
             
-            for result in fizzbuzz_results:
-                text_results.append(f"{result.number:4d}: {result.text}")
-                heatmap_data.append((result.number, result.text, result.result_type))
+            async for chunk_start, chunk_end, columns in self.generate_chunks(start, end, blocks):
+                rows = slice(chunk_start - start, chunk_end - start + 1)
                 
-                # Update display periodically
-                if len(text_results) >= 50:
-                    self.root.after(0, lambda r=text_results.copy(): self.update_results_display(r))
-                    text_results.clear()
-            
-            # Update any remaining results
-            if text_results:
-                self.root.after(0, lambda r=text_results: self.update_results_display(r))
+                # Heatmap colour index of each number, looked up once per match combination and spread
+                # over the numbers with array indexing
+                combo_values = np.array([self.get_type_value(result_type) for result_type in columns['combo_types']],
+                                        dtype=heatmap_dtype)
+                np.take(combo_values, columns['combo_index'], out=heatmap_values[rows])
+                
+                # Store the results for display as codes into the table of result texts, which the chunk's
+                # match combinations are added to
+                text_codes = np.array([self.result_text_code(text) for text in columns['combo_texts']],
+                                      dtype=np.int32)
+                np.take(text_codes, columns['combo_index'], out=self.result_codes[rows])
+                self.results_count = chunk_end - start + 1
+                self.pending_progress = (chunk_end - start + 1) / total_numbers * 100
             
             # Create heatmap and finalize
-            total_numbers = len(fizzbuzz_results)
-            self.root.after(0, lambda: self.finalize_generation(heatmap_data, total_numbers))
+            self.finalize_generation(heatmap_values, total_numbers)
             
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Generation failed: {str(e)}"))
+            messagebox.showerror("Error", f"Generation failed: {str(e)}")
+        finally:
+            self.generation_complete()
+    
+    async def generate_chunks(self, start: int, end: int, blocks: List[RuleBlock]):
+        # Yield (chunk_start, chunk_end, classify_range columns) for consecutive chunks of the range, in order.
+        # Large ranges are generated by the worker pool while Tk keeps running, smaller ones here between Tk events
+        if end - start + 1 <= PARALLEL_THRESHOLD:
+            # Build the prime and Fibonacci flags once for the whole range rather than once per chunk
+            prime_flags, fibonacci_flags = batch_flags(start, end, blocks)
+            for chunk_start in range(start, end + 1, GENERATION_CHUNK):
+                chunk_end = min(chunk_start + GENERATION_CHUNK - 1, end)
+                
+                # Match the whole chunk with NumPy masks rather than processing each number in Python
+                yield chunk_start, chunk_end, classify_range(chunk_start, chunk_end, blocks,
+                                                             prime_flags, fibonacci_flags, start)
+                await asyncio.sleep(0)
+            return
+        
+        workers = os.cpu_count() or 1
+        if self.worker_pool is None:
+            # Worker threads don't need the slices pickled to and from them, but they only run in parallel
+            # on a free-threaded build of Python (3.13t and later), so processes are used while the GIL is enabled
+            if getattr(sys, '_is_gil_enabled', lambda: True)():
+                self.worker_pool = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self.worker_pool = ThreadPoolExecutor(max_workers=workers)
+        
+        # Slices are submitted as earlier ones are taken rather than all at once, keeping a bounded number
+        # in flight however large the range is
+        bounds = ((s, min(s + PARALLEL_CHUNK - 1, end)) for s in range(start, end + 1, PARALLEL_CHUNK))
+        in_flight = deque()
+        
+        def submit_next():
+            next_bounds = next(bounds, None)
+            if next_bounds is not None:
+                in_flight.append((*next_bounds, self.worker_pool.submit(process_range_chunk, *next_bounds, blocks)))
+        
+        try:
+            for _ in range(workers * PARALLEL_IN_FLIGHT):
+                submit_next()
+            while in_flight:
+                chunk_start, chunk_end, future = in_flight.popleft()
+                columns = await asyncio.wrap_future(future, loop=self.loop)
+                submit_next()  # Keep the workers busy while this slice is shown
+                yield chunk_start, chunk_end, columns
+        except BrokenExecutor:
+            # A worker died (killed for running out of memory, say), which leaves the pool unusable,
+            # so let the next generation start a new one
+            self.worker_pool.shutdown(wait=False)
+            self.worker_pool = None
+            raise
         finally:
-            self.root.after(0, self.generation_complete)
+            # Drop slices that haven't started if generation stops early
+            for _, _, future in in_flight:
+                future.cancel()
     
-    def update_results_display(self, new_results: List[str]):
-        # Update results text display with new results
-        for result in new_results:
-            self.results_text.insert(tk.END, result + '\n')
+    def update_results_display(self, new_text: str):
+        # Append a chunk of results text built by format_results_text, in one insert so Tk lays out the text once
+        if not new_text:
+            return
+        self.results_text.insert(tk.END, new_text)
         self.results_text.see(tk.END)
     
-    def clear_display(self):
-        # Clear results text and heatmap
+    def reset_results(self, start: int, total_numbers: int):
+        # Clear the results for a new generation of total_numbers results from start, choosing between
+        # inserting every row into the results text and the virtual view of the rows around the visible ones
+        self.results_start = start
+        self.result_codes = np.zeros(total_numbers, dtype=np.int32)
+        self.result_texts = []
+        self.result_text_codes = {}
+        self.results_count = 0
+        self.results_shown = 0
+        self.results_top = 0
+        self.results_follow = True
         self.results_text.delete("1.0", tk.END)
-        self.clear_heatmap()
+        
+        # The virtual view takes over the scrollbar, as the text only holds the rows that are shown
+        self.results_virtual = total_numbers > VIRTUAL_RESULTS_THRESHOLD
+        if self.results_virtual:
+            self.results_text.configure(yscrollcommand='')
+            self.results_scrollbar.configure(command=self.on_results_scroll)
+        else:
+            self.results_text.configure(yscrollcommand=self.results_scrollbar.set)
+            self.results_scrollbar.configure(command=self.results_text.yview)
+    
+    def result_text_code(self, text: Optional[str]) -> int:
+        # Index of a result text in result_texts, adding texts not seen before
+        code = self.result_text_codes.get(text)
+        if code is None:
+            code = self.result_text_codes[text] = len(self.result_texts)
+            self.result_texts.append(text)
+        return code
+    
+    def format_result_rows(self, first_row: int, last_row: int) -> str:
+        # Format the results from row first_row up to (not including) last_row as results text
+        first_number = self.results_start + first_row
+        texts = expand_texts(first_number, self.result_codes[first_row:last_row], self.result_texts)
+        return format_results_text(range(first_number, self.results_start + last_row), texts)
+    
+    def flush_results(self):
+        # Show the results generated since the last flush, appended in one insert or, in the virtual view,
+        # by showing the last rows again when the view is following them
+        if self.results_shown == self.results_count:
+            return
+        
+        if self.results_virtual:
+            self.results_shown = self.results_count
+            if self.results_follow:
+                self.results_top = max(self.results_count - self.visible_result_rows(), 0)
+            self.render_results_view()
+        else:
+            self.update_results_display(self.format_result_rows(self.results_shown, self.results_count))
+            self.results_shown = self.results_count
+    
+    def visible_result_rows(self) -> int:
+        # Number of rows that fit in the results text at its current height
+        return max(self.results_text.winfo_height() // self.results_font.metrics('linespace'), 1)
+    
+    def render_results_view(self):
+        # Replace the text of the virtual view with the rows from results_top, and size the scrollbar
+        # thumb to the visible rows out of all the results shown
+        last_row = min(self.results_top + RESULTS_VIEW_ROWS, self.results_shown)
+        self.results_text.delete("1.0", tk.END)
+        if self.results_top < last_row:
+            self.results_text.insert(tk.END, self.format_result_rows(self.results_top, last_row))
+        
+        total = max(self.results_shown, 1)
+        self.results_scrollbar.set(self.results_top / total,
+                                   min(self.results_top + self.visible_result_rows(), total) / total)
+    
+    def scroll_results_to(self, top: int):
+        # Show the virtual view from row top, as far as the last rows filling the text, and follow new
+        # rows if that leaves the last rows visible
+        last_top = max(self.results_shown - self.visible_result_rows(), 0)
+        self.results_top = min(max(top, 0), last_top)
+        self.results_follow = self.results_top == last_top
+        self.render_results_view()
+    
+    def on_results_scroll(self, action: str, amount: str, unit: Optional[str] = None):
+        # Scrollbar command of the virtual view, for dragging the thumb ('moveto') and the arrows and trough ('scroll')
+        if action == 'moveto':
+            self.scroll_results_to(int(float(amount) * self.results_shown))
+        else:
+            step = self.visible_result_rows() if unit == 'pages' else 1
+            self.scroll_results_to(self.results_top + int(amount) * step)
+    
+    def on_results_wheel(self, event):
+        # Scroll the virtual view by mouse wheel, Button-4 and Button-5 being the wheel on X11
+        if not self.results_virtual:
+            return None
+        up = event.num == 4 or event.delta > 0
+        self.scroll_results_to(self.results_top + (-RESULTS_WHEEL_ROWS if up else RESULTS_WHEEL_ROWS))
+        return "break"
     
-    def finalize_generation(self, heatmap_data: List[Tuple[int, str, str]], total_numbers: int):
+    def finalize_generation(self, heatmap_data: np.ndarray, total_numbers: int):
         # Create heatmap and set completion status
         self.create_heatmap(heatmap_data)
         self.set_status(f"Generated {total_numbers} results")
     
     def generation_complete(self):
         # Handle completion of generation
-        self.is_generating = False
-        self.generate_btn.configure(text="Generate FizzBuzz", state=tk.NORMAL)
-        self.progress_var.set(100)
+        self.generating_var.set(False)
     
-    def create_heatmap(self, results_data: List[Tuple[int, str, str]]):
-        # Create a matplotlib heatmap visualization
-        self.clear_heatmap()
-        
-        if not results_data:
+    def on_generating_change(self, *args):
+        # Update the generate button and progress bar for a change in generation state
+        if self.generating_var.get():
+            self.generate_btn.configure(text="Generating...", state=tk.DISABLED)
+            self.pending_progress = 0.0
+            self.progress_var.set(0)
+            self.progress_tick_id = self.root.after(PROGRESS_TICK_MS, self.progress_tick)
+            self.results_flush_id = self.root.after(RESULTS_FLUSH_MS, self.results_tick)
+        else:
+            self.generate_btn.configure(text="Generate FizzBuzz", state=tk.NORMAL)
+            self.cancel_progress_tick()
+            self.cancel_results_tick()
+            self.flush_results()
+            self.progress_var.set(100)
+    
+    def progress_tick(self):
+        # Copy the latest progress to the progress bar and status, at most once per tick however often it changes
+        if self.progress_var.get() != self.pending_progress:
+            self.progress_var.set(self.pending_progress)
+            self.set_status(f"Generating... {self.pending_progress:.0f}%")
+        self.progress_tick_id = self.root.after(PROGRESS_TICK_MS, self.progress_tick)
+    
+    def cancel_progress_tick(self):
+        # Stop the progress timer if it is running
+        if self.progress_tick_id is not None:
+            self.root.after_cancel(self.progress_tick_id)
+            self.progress_tick_id = None
+    
+    def results_tick(self):
+        # Append the results generated since the last tick, so the results view is updated a bounded number
+        # of times per second however small the chunks are
+        self.flush_results()
+        self.results_flush_id = self.root.after(RESULTS_FLUSH_MS, self.results_tick)
+    
+    def cancel_results_tick(self):
+        # Stop the results timer if it is running
+        if self.results_flush_id is not None:
+            self.root.after_cancel(self.results_flush_id)
+            self.results_flush_id = None
+    
+    def create_heatmap(self, results_data: np.ndarray):
+        # Create a heatmap visualization from the colour index of each result, as a plain image or,
+        # in detailed mode, a matplotlib figure
+        self.heatmap_results = results_data
+        if not len(results_data):
+            self.clear_heatmap()
             return
         
-        # Handle all datasets without sampling
         total_numbers = len(results_data)
-        display_data = results_data
         
         # Always create a square grid
         grid_size = int(np.ceil(np.sqrt(total_numbers)))
-        cols = grid_size
-        rows = grid_size
-        
-        # Keep figure size constant regardless of grid size
-        # This ensures the heatmap always takes the same visual space
-        figure_size = 6  # Fixed size for consistent visual appearance
-        self.heatmap_fig.set_size_inches(figure_size, figure_size)
         
-        # Create 2D array for heatmap data
-        heatmap_data = np.full((rows, cols), -1, dtype=int)  # -1 for empty cells
+        # Large grids would have more cells than the figure has pixels, so only every stride-th row and column is drawn
+        stride = -(-grid_size // HEATMAP_MAX_CELLS)
         
-        # Fill the grid with data
-        for i, (number, result, result_type) in enumerate(display_data):
-            row = i // cols
-            col = i % cols
-            if row < rows and col < cols:
-                heatmap_data[row, col] = self.get_type_value(result_type)
+        # The results are laid out row by row on the full grid, so the cell in every stride-th row and column
+        # holds the result at row * grid_size + column. Only those cells are gathered, the full grid is never built.
+        # Colour indices use the smallest integer type that holds them
+        sampled = np.arange(0, grid_size, stride)
+        cell_index = (sampled * grid_size)[:, None] + sampled
+        filled = cell_index < total_numbers
+        heatmap_data = np.full(cell_index.shape, -1, dtype=self.heatmap_dtype())  # -1 for empty cells
+        heatmap_data[filled] = results_data[cell_index[filled]]
         
-        # Create custom colormap
         colors, type_labels = self.get_colors_and_labels()
-        cmap = ListedColormap(colors)
+        title = f"FizzBuzz Heatmap ({len(results_data)} numbers)"
+        
+        detailed = self.heatmap_detailed_var.get()
+        self.show_heatmap_view(detailed)
+        if detailed:
+            self.draw_detailed_heatmap(heatmap_data, colors, type_labels, title)
+        else:
+            self.draw_simple_heatmap(heatmap_data, colors, type_labels, title)
+    
+    def draw_simple_heatmap(self, heatmap_data: np.ndarray, colors: List[str], type_labels: List[str], title: str):
+        # Draw the heatmap cells as a Tk image: each colour index is looked up in an RGB palette, the cells are
+        # scaled up by a whole number of pixels, and the pixels are handed to Tk as PPM data
+        rows, cols = heatmap_data.shape
+        
+        # Indices past the colours take the last colour, as in the matplotlib colormap, and -1 (empty cells)
+        # takes the white entry added at the end of the palette
+        palette = np.frombuffer(b''.join(bytes.fromhex(color[1:]) for color in colors) + b'\xff\xff\xff',
+                                dtype=np.uint8).reshape(-1, 3)
+        pixels = palette[np.minimum(heatmap_data, len(colors) - 1)]
+        
+        # Scale the cells up by a whole number of pixels, with white grid lines along their edges, or stretch
+        # cells too small for grid lines to the full image size with some a pixel wider than others
+        side = max(rows, cols)
+        scale = HEATMAP_IMAGE_PIXELS // side
+        if scale >= HEATMAP_MIN_GRID_PIXELS:
+            pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+            pixels[scale - 1::scale] = 255
+            pixels[:, scale - 1::scale] = 255
+        else:
+            row_index = np.arange(HEATMAP_IMAGE_PIXELS * rows // side) * side // HEATMAP_IMAGE_PIXELS
+            column_index = np.arange(HEATMAP_IMAGE_PIXELS * cols // side) * side // HEATMAP_IMAGE_PIXELS
+            pixels = pixels[row_index[:, None], column_index]
+        
+        height, width = pixels.shape[:2]
+        ppm = b'P6 %d %d 255\n' % (width, height) + pixels.tobytes()
+        self.heatmap_photo = tk.PhotoImage(data=ppm, format='PPM')
+        self.heatmap_image_label.configure(image=self.heatmap_photo)
+        self.heatmap_caption.configure(text=title)
+        self.update_simple_legend(colors, type_labels)
+    
+    def update_simple_legend(self, colors: List[str], labels: List[str]):
+        # Show a colour swatch and label per heatmap colour under the plain heatmap, HEATMAP_LEGEND_COLUMNS to a row,
+        # rebuilt only when the colours or labels change
+        if self.heatmap_simple_legend_key == (colors, labels):
+            return
         
-        # Create the heatmap
-        im = self.heatmap_ax.imshow(heatmap_data, cmap=cmap, aspect='equal', 
+        for widget in self.heatmap_legend_frame.winfo_children():
+            widget.destroy()
+        for i, (color, label) in enumerate(zip(colors, labels)):
+            row, column = divmod(i, HEATMAP_LEGEND_COLUMNS)
+            tk.Label(self.heatmap_legend_frame, bg=color, width=2).grid(row=row, column=2 * column,
+                                                                        padx=(8, 3), pady=2)
+            tk.Label(self.heatmap_legend_frame, text=label, font=('Arial', 9), bg='white').grid(
+                row=row, column=2 * column + 1, sticky="w")
+        self.heatmap_simple_legend_key = (colors, labels)
+    
+    def draw_detailed_heatmap(self, heatmap_data: np.ndarray, colors: List[str], type_labels: List[str],
+                              title: str):
+        # Draw the heatmap cells with matplotlib, with grid lines and a legend
+        from matplotlib.collections import LineCollection
+        rows, cols = heatmap_data.shape
+        
+        # With the same grid size and legend only the cell values differ, so update the existing image
+        # and blit it over the saved background instead of rebuilding and re-rendering the whole figure
+        if (self.heatmap_image is not None and self.heatmap_background is not None
+                and self.heatmap_image.get_array().shape == heatmap_data.shape
+                and self.heatmap_legend_key == (colors, type_labels)):
+            self.heatmap_image.set_data(heatmap_data)
+            self.heatmap_ax.title.set_text(title)
+            self.heatmap_canvas.restore_region(self.heatmap_background)
+            self.draw_heatmap_artists()
+            self.heatmap_canvas.blit(self.heatmap_blit_box)
+            return
+        
+        self.clear_heatmap()
+        self.update_heatmap_style(colors, type_labels)
+        
+        # Create the heatmap, the image and title are animated so they stay out of the saved background
+        im = self.heatmap_ax.imshow(heatmap_data, cmap=self.heatmap_cmap, aspect='equal', animated=True,
                                    vmin=0, vmax=len(colors)-1, interpolation='nearest')
         
         # Customize the plot
-        title = f"FizzBuzz Heatmap ({len(results_data)} numbers)"
         self.heatmap_ax.set_title(title, fontsize=12, fontweight='bold', pad=20)
+        self.heatmap_ax.title.set_animated(True)
         self.heatmap_ax.set_xlim(-0.5, cols-0.5)
         self.heatmap_ax.set_ylim(rows-0.5, -0.5)  # Invert y-axis for top-to-bottom reading
         
@@ -794,64 +1277,135 @@ class GUI:
         self.heatmap_ax.set_xticks([])
         self.heatmap_ax.set_yticks([])
         
-        # Add grid lines
-        for i in range(cols + 1):
-            self.heatmap_ax.axvline(i - 0.5, color='white', linewidth=1)
-        for i in range(rows + 1):
-            self.heatmap_ax.axhline(i - 0.5, color='white', linewidth=1)
-        
         # Create custom legend
-        self.create_matplotlib_legend(type_labels)
+        self.create_matplotlib_legend()
+        
+        # Add grid lines along the cell edges, as one collection so they are drawn in a single call
+        # rather than as an artist per line. fit_heatmap_layout hides them when the cells are too small to show them
+        segments = ([[(x - 0.5, -0.5), (x - 0.5, rows - 0.5)] for x in range(cols + 1)] +
+                    [[(-0.5, y - 0.5), (cols - 0.5, y - 0.5)] for y in range(rows + 1)])
+        self.heatmap_grid = self.heatmap_ax.add_collection(
+            LineCollection(segments, colors='white', linewidths=1), autolim=False)
         
-        # Refresh the canvas
-        self.heatmap_fig.tight_layout()
-        self.heatmap_canvas.draw()
+        self.heatmap_image = im
+        self.heatmap_legend_key = (colors, type_labels)
+        self.fit_heatmap_layout()
+        
+        # Refresh the canvas, the draw event saves the background and draws the animated artists
+        self.heatmap_canvas.draw_idle()
     
-    def get_type_value(self, result_type: str) -> int:
-        # Map result types to numeric values based on current blocks and core result types
-        if result_type == 'number':
-            return 0
+    def layout_heatmap_figure(self, legend_rows: int):
+        # Place the axes inside fixed pixel margins that leave room for the title and the legend rows,
+        # rather than measuring every artist with tight_layout
+        width, height = self.heatmap_fig.bbox.width, self.heatmap_fig.bbox.height
+        bottom = HEATMAP_BOTTOM_MARGIN + legend_rows * HEATMAP_LEGEND_ROW_PIXELS
+        
+        # When the margins leave no room for the axes, as with many legend rows or a small canvas,
+        # tight_layout does what it can, which subplots_adjust would refuse with an error
+        if bottom + HEATMAP_TOP_MARGIN >= height or 2 * HEATMAP_SIDE_MARGIN >= width:
+            self.heatmap_fig.tight_layout()
+            return
         
-        # Find the correct index by matching against the actual block order
-        value = 1  # Start at 1 (after numbers at index 0)
-        for block in sorted(self.blocks, key=lambda b: b.order):
+        self.heatmap_fig.subplots_adjust(left=HEATMAP_SIDE_MARGIN / width, right=1 - HEATMAP_SIDE_MARGIN / width,
+                                         top=1 - HEATMAP_TOP_MARGIN / height, bottom=bottom / height)
+    
+    def fit_heatmap_layout(self):
+        # Lay out the figure for the current canvas size, then show the grid lines only if the cells on screen
+        # are large enough for them
+        colors, _ = self.heatmap_legend_key
+        self.layout_heatmap_figure(-(-len(colors) // HEATMAP_LEGEND_COLUMNS))
+        
+        rows, cols = self.heatmap_image.get_array().shape
+        axes_box = self.heatmap_ax.get_window_extent()
+        cell_pixels = min(axes_box.width / cols, axes_box.height / rows)
+        self.heatmap_grid.set_visible(cell_pixels >= HEATMAP_MIN_GRID_PIXELS)
+    
+    def on_heatmap_resize(self, event):
+        # The canvas follows the size of its frame, so fit the layout, worked out in pixels, to the new size.
+        # The saved background is for the old size, so blits wait for the redraw after the resize to save another
+        self.heatmap_background = None
+        if self.heatmap_image is not None:
+            self.fit_heatmap_layout()
+    
+    def on_heatmap_draw(self, event):
+        # Save the freshly drawn background for blitting, then put the animated artists on top of it
+        from matplotlib.transforms import Bbox
+        self.heatmap_background = self.heatmap_canvas.copy_from_bbox(self.heatmap_fig.bbox)
+        
+        # Blits only change the axes and the title above them, so the legend below isn't copied to the screen again.
+        # The box reaches a pixel below the axes for the half of the bottom grid line outside them
+        figure_box = self.heatmap_fig.bbox
+        self.heatmap_blit_box = Bbox.from_extents(figure_box.x0, self.heatmap_ax.bbox.y0 - 1,
+                                                  figure_box.x1, figure_box.y1)
+        self.draw_heatmap_artists()
+    
+    def draw_heatmap_artists(self):
+        # Draw the heatmap image, then the grid lines it covers, then the title
+        if self.heatmap_image is None:
+            return
+        self.heatmap_ax.draw_artist(self.heatmap_image)
+        if self.heatmap_grid is not None:
+            self.heatmap_ax.draw_artist(self.heatmap_grid)
+        self.heatmap_ax.draw_artist(self.heatmap_ax.title)
+    
+    def update_block_caches(self, sorted_blocks: List[RuleBlock]):
+        # Work out the result type values, heatmap colours and labels for the blocks in order
+        self.fizz_and_buzz = self.has_fizz_and_buzz()
+        
+        # Each result type maps to the first block it matches, starting at 1 (after numbers at index 0)
+        type_values = {'number': 0}
+        for value, block in enumerate(sorted_blocks, 1):
             word = block.properties.get('word', '')
-            
-            # Check if this block matches the result type
-            if ((result_type == 'Fizz' and word == 'Fizz') or
-                (result_type == 'Buzz' and word == 'Buzz') or
-                (result_type == 'Prime' and block.block_type == BlockType.PRIME) or
-                (result_type == 'Fib' and block.block_type == BlockType.FIBONACCI) or
-                (result_type == 'divisor_custom' and block.block_type == BlockType.DIVISOR and word not in ['Fizz', 'Buzz']) or
-                (result_type == 'range_custom' and block.block_type == BlockType.RANGE)):
-                return value
-            value += 1
-        
-        # Handle specific FizzBuzz case
-        if result_type == 'FizzBuzz' and self.has_fizz_and_buzz():
-            return len(self.blocks) + 1
-        
-        # Others combination
-        if result_type == 'combination':
-            return len(self.blocks) + 2
-        
-        # Fallback just incase
-        return len(self.blocks) + 2
+            matched_types = []
+            if word in ('Fizz', 'Buzz'):
+                matched_types.append(word)
+            if block.block_type == BlockType.PRIME:
+                matched_types.append('Prime')
+            elif block.block_type == BlockType.FIBONACCI:
+                matched_types.append('Fib')
+            elif block.block_type == BlockType.DIVISOR and word not in ('Fizz', 'Buzz'):
+                matched_types.append('divisor_custom')
+            elif block.block_type == BlockType.RANGE:
+                matched_types.append('range_custom')
+            for result_type in matched_types:
+                type_values.setdefault(result_type, value)
+        
+        # Handle specific FizzBuzz case, other combinations fall back to len(blocks) + 2 in get_type_value
+        if self.fizz_and_buzz:
+            type_values.setdefault('FizzBuzz', len(sorted_blocks) + 1)
+        self.type_values = type_values
+        
+        self.heatmap_colors, self.heatmap_labels = self.build_colors_and_labels(sorted_blocks)
+    
+    def get_type_value(self, result_type: str) -> int:
+        # Map result types to numeric values based on current blocks and core result types
+        return self.type_values.get(result_type, len(self.blocks) + 2)
+    
+    def heatmap_dtype(self) -> np.dtype:
+        # Smallest integer type for heatmap colour indices, holding both -1 for empty cells and the
+        # len(blocks) + 2 that get_type_value gives other combinations. A signed type that reaches
+        # -(largest + 1) also reaches largest.
+        largest = len(self.blocks) + 2
+        return np.min_scalar_type(-(largest + 1))
     
     def get_colors_and_labels(self) -> Tuple[List[str], List[str]]:
         # Get colour mapping and labels using block colours, matching core result types
+        return self.heatmap_colors, self.heatmap_labels
+    
+    def build_colors_and_labels(self, sorted_blocks: List[RuleBlock]) -> Tuple[List[str], List[str]]:
+        # Build the colour mapping and labels for the blocks in order
         colors = []
         labels = []
         
         # Add number colour (always first - index 0)
-        colors.append("#E5E7EB")
+        colors.append(NUMBER_COLOR)
         labels.append("Numbers")
         
         # Add colours for active blocks in order (indices 1, 2, 3, ...)
-        for block in sorted(self.blocks, key=lambda b: b.order):
+        for block in sorted_blocks:
             word = block.properties.get('word', '')
-            if word and block.id in self.block_colors:
-                colors.append(self.block_colors[block.id])
+            if word and block.color:
+                colors.append(block.color)
                 # Use the actual word as the label
                 if block.block_type == BlockType.PRIME:
                     labels.append(f"Prime ({word})")
@@ -861,34 +1415,51 @@ class GUI:
                     labels.append(word)
         
         # Add FizzBuzz combination color (index len(blocks) + 1)
-        if self.has_fizz_and_buzz():
-            colors.append("#8B5CF6")  # Purple for FizzBuzz
+        if self.fizz_and_buzz:
+            colors.append(FIZZBUZZ_COLOR)
             labels.append("FizzBuzz")
         
         # Add general combination colour (index len(blocks) + 2)
-        if len(self.blocks) > 1:
-            colors.append("#FF2ED9")  # Pink for other combinations
+        if len(sorted_blocks) > 1:
+            colors.append(COMBINATION_COLOR)
             labels.append("Combinations")
         
         return colors, labels
     
-    def create_matplotlib_legend(self, type_labels: List[str]):
-        # Create a simple legend for the matplotlib heatmap using actual block colors and labels
-        colors, labels = self.get_colors_and_labels()
+    def update_heatmap_style(self, colors: List[str], labels: List[str]):
+        # Build the colormap and a legend patch per colour for the heatmap, unless they were built
+        # for the same colours and labels, which only change with the blocks
+        if self.heatmap_style_key == (colors, labels):
+            return
         
-        # Create legend patches for all active types
-        legend_elements = []
-        for color, label in zip(colors, labels):
-            legend_elements.append(patches.Rectangle((0, 0), 1, 1, facecolor=color, label=label))
+        from matplotlib.colors import ListedColormap
+        import matplotlib.patches as patches
         
+        self.heatmap_cmap = ListedColormap(colors)
+        self.heatmap_cmap.set_under((0, 0, 0, 0))  # Empty cells at the end of the grid are left transparent
+        self.heatmap_legend_handles = [patches.Rectangle((0, 0), 1, 1, facecolor=color, label=label)
+                                       for color, label in zip(colors, labels)]
+        self.heatmap_style_key = (colors, labels)
+    
+    def create_matplotlib_legend(self):
+        # Create a simple legend for the matplotlib heatmap from the legend patches of update_heatmap_style
         # Position legend below the plot
-        if legend_elements:
-            self.heatmap_ax.legend(handles=legend_elements, loc='upper center', 
-                                 bbox_to_anchor=(0.5, -0.05), ncol=3, fontsize=9)
+        if self.heatmap_legend_handles:
+            self.heatmap_ax.legend(handles=self.heatmap_legend_handles, loc='upper center', 
+                                 bbox_to_anchor=(0.5, -0.05), ncol=HEATMAP_LEGEND_COLUMNS, fontsize=9)
     
     def clear_heatmap(self):
-        # Clear the matplotlib heatmap display
+        # Clear the plain and matplotlib heatmap displays
+        self.heatmap_photo = None
+        self.heatmap_image_label.configure(image='')
+        self.heatmap_caption.configure(text="FizzBuzz Heatmap")
+        
+        if self.heatmap_fig is None:
+            return
         self.heatmap_ax.clear()
+        self.heatmap_image = None
+        self.heatmap_grid = None
+        self.heatmap_legend_key = None
         self.heatmap_ax.set_title("FizzBuzz Heatmap", fontsize=12, fontweight='bold', pad=20)
         self.heatmap_ax.set_xticks([])
         self.heatmap_ax.set_yticks([])
@@ -910,9 +1481,20 @@ class GUI:
     
     def on_closing(self):
         # Clean up and close the application properly
+        if self.generation_task and not self.generation_task.done():
+            self.generation_task.cancel()
+            self.loop.run_until_complete(asyncio.gather(self.generation_task, return_exceptions=True))
+        self.cancel_progress_tick()
+        self.cancel_results_tick()
+        self.loop.close()
+        
+        if self.worker_pool:
+            self.worker_pool.shutdown(wait=False)
+        
         try:
             # Close matplotlib figure to free resources
-            if hasattr(self, 'heatmap_fig'):
+            if self.heatmap_fig is not None:
+                import matplotlib.pyplot as plt
                 plt.close(self.heatmap_fig)
         except:
             pass